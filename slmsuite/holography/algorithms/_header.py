@@ -11,6 +11,9 @@ import scipy.fft as spfft
 from scipy.ndimage import gaussian_filter1d as sp_gaussian_filter1d
 from scipy.ndimage import affine_transform as sp_affine_transform
 from scipy.ndimage import gaussian_filter as sp_gaussian_filter
+from scipy.signal import lfilter as sp_lfilter
+from scipy.signal import lfilter_zi as sp_lfilter_zi
+import scipy.sparse as sp_sparse
 
 # Try to import cupy, but revert to base numpy/scipy upon ImportError.
 try:
@@ -20,6 +23,7 @@ try:
     from cupyx.scipy.ndimage import gaussian_filter1d as cp_gaussian_filter1d   # type: ignore
     from cupyx.scipy.ndimage import gaussian_filter as cp_gaussian_filter       # type: ignore
     from cupyx.scipy.ndimage import affine_transform as cp_affine_transform     # type: ignore
+    import cupyx.scipy.sparse as cp_sparse                                      # type: ignore
 except ImportError:
     cp = np
     cpfft = spfft
@@ -27,6 +31,7 @@ except ImportError:
     cp_gaussian_filter1d = sp_gaussian_filter1d
     cp_gaussian_filter = sp_gaussian_filter
     cp_affine_transform = sp_affine_transform
+    cp_sparse = sp_sparse
     warnings.warn(
         "cupy is not installed; using numpy. Install cupy for faster GPU-based holography."
     )
@@ -173,6 +173,9 @@ class Hologram(_HologramStats):
             iteration. Note that this can be a good amount of data.
          - ``"blur_ij"`` : ``float``
             See :meth:`~slmsuite.holography.algorithms.FeedbackHologram.ijcam_to_knmslm()`.
+         - ``"feedback_order"`` : ``int``
+            Interpolation order used to transform experimental feedback to the ``"knm"``
+            basis. See :meth:`~slmsuite.holography.algorithms.FeedbackHologram.measure()`.
          - Other user-defined flags.
 
     stats : dict
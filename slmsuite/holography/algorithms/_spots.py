@@ -940,7 +940,7 @@ class CompressedSpotHologram(_AbstractSpotHologram):
             self.measure(basis="ij")
 
             amp_feedback = np.sqrt(analysis.take(
-                np.square(np.array(self.img_ij, copy=(False if np.__version__[0] == '1' else None), dtype=self.dtype)),
+                self._get_img_ij_pwr(),
                 self.spot_ij,
                 self.spot_integration_width_ij,
                 centered=True,
@@ -979,7 +979,7 @@ class CompressedSpotHologram(_AbstractSpotHologram):
         if "experimental_spot" in stat_groups:
             self.measure(basis="ij")
 
-            pwr_img = np.square(self.img_ij)
+            pwr_img = self._get_img_ij_pwr()
 
             pwr_feedback = analysis.take(
                 pwr_img,
@@ -1607,7 +1607,7 @@ class SpotHologram(_AbstractSpotHologram):
 
                 amp_feedback = np.sqrt(
                     analysis.take(
-                        np.square(np.array(self.img_ij, copy=(False if np.__version__[0] == '1' else None), dtype=self.dtype)),
+                        self._get_img_ij_pwr(),
                         self.spot_ij,
                         self.spot_integration_width_ij,
                         centered=True,
@@ -1692,7 +1692,7 @@ class SpotHologram(_AbstractSpotHologram):
         if "experimental_spot" in stat_groups:
             self.measure(basis="ij")
 
-            pwr_img = np.square(self.img_ij)
+            pwr_img = self._get_img_ij_pwr()
 
             pwr_feedback = analysis.take(
                 pwr_img, self.spot_ij, self.spot_integration_width_ij, centered=True, integrate=True
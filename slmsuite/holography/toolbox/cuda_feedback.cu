@@ -0,0 +1,153 @@
+// This file is loaded into slmsuite.holography.algorithms._feedback at runtime.
+// It is kept separate from cuda.cu, such that a failure to compile these kernels
+// (e.g. texture objects on HIP) does not break the kernels in cuda.cu.
+
+// Recursive Gaussian filter
+
+// Young-van Vliet recursive (IIR) Gaussian filter applied in-place along one line.
+//   The filter is a causal third-order recursion followed by an anti-causal one, so the
+//   cost per sample is independent of sigma. Histories are initialized with the edge
+//   value (the steady state of a constant signal), approximating "nearest" boundaries.
+//   The kernels filter along the columns of a row-major (N, L) array with one thread per
+// column, such that adjacent threads access adjacent memory (coalesced). To filter along
+// rows, the caller filters the columns of the transpose.
+template <typename T>
+__device__ void iir_gaussian_line(
+    T* line,                        // Line to filter (in-place)
+    const int N,                    // Length of the line
+    const int stride,               // Stride between elements of the line
+    const T B,                      // Normalization coefficient
+    const T b1,                     // Recursion coefficients (normalized by b0)
+    const T b2,
+    const T b3
+) {
+    // Forward (causal) sweep.
+    T w1 = line[0];
+    T w2 = w1;
+    T w3 = w1;
+    for (int n = 0; n < N; n++) {
+        T w = B * line[n * stride] + b1 * w1 + b2 * w2 + b3 * w3;
+        line[n * stride] = w;
+        w3 = w2; w2 = w1; w1 = w;
+    }
+
+    // Backward (anti-causal) sweep.
+    T y1 = line[(N - 1) * stride];
+    T y2 = y1;
+    T y3 = y1;
+    for (int n = N - 1; n >= 0; n--) {
+        T y = B * line[n * stride] + b1 * y1 + b2 * y2 + b3 * y3;
+        line[n * stride] = y;
+        y3 = y2; y2 = y1; y1 = y;
+    }
+}
+
+extern "C" __global__ void iir_gaussian_filter_float(
+    float* data,                    // Input/output array (in-place)
+    const int L,                    // Number of columns
+    const int N,                    // Number of rows (length of each column)
+    const float B,
+    const float b1,
+    const float b2,
+    const float b3
+) {
+    // l is the index of the column handled by this thread.
+    int l = blockDim.x * blockIdx.x + threadIdx.x;
+
+    if (l < L) {
+        iir_gaussian_line<float>(data + l, N, L, B, b1, b2, b3);
+    }
+}
+
+extern "C" __global__ void iir_gaussian_filter_double(
+    double* data,                   // Input/output array (in-place)
+    const int L,                    // Number of columns
+    const int N,                    // Number of rows (length of each column)
+    const double B,
+    const double b1,
+    const double b2,
+    const double b3
+) {
+    // l is the index of the column handled by this thread.
+    int l = blockDim.x * blockIdx.x + threadIdx.x;
+
+    if (l < L) {
+        iir_gaussian_line<double>(data + l, N, L, B, b1, b2, b3);
+    }
+}
+
+// Affine transformation
+
+// Samples a float texture at the affine-transformed coordinates of each output pixel,
+// following the conventions of cupyx.scipy.ndimage.affine_transform (coordinates are
+// in (row, column) order). The texture's filter mode determines the interpolation:
+// cudaFilterModeLinear for bilinear (order=1) or cudaFilterModePoint for nearest (order=0).
+// Note that the hardware computes bilinear weights in 8-bit fixed point, so order=1 deviates
+// from exact interpolation by up to ~1/256 of the local pixel-to-pixel difference.
+// Points outside the input are set to cval.
+//   The absolute value of each sample is written to the output, and the sum of squares
+// of the non-nan samples is accumulated into norm_sq (reduced per block, then atomically
+// across blocks), such that normalization only needs one more pass over the output.
+//   Expects blocks of AFFINE_BLOCK_SIZE threads.
+#define AFFINE_BLOCK_SIZE 256
+
+extern "C" __global__ void affine_transform_texture(
+    const cudaTextureObject_t tex,  // Input image as a texture (H_in, W_in)
+    float* out,                     // Output (H_out, W_out)
+    float* norm_sq,                 // Output sum of squares (1), zeroed beforehand
+    const int H_out,                // Output shape
+    const int W_out,
+    const int H_in,                 // Input shape
+    const int W_in,
+    const double* M,                // Affine matrix (2x2, row-major)
+    const double* b,                // Affine offset (2)
+    const int order,                // Interpolation order (0 or 1)
+    const float cval                // Value outside the input
+) {
+    __shared__ float sdata[AFFINE_BLOCK_SIZE];
+
+    // (i, j) is the (row, column) of the output pixel.
+    int j = blockDim.x * blockIdx.x + threadIdx.x;
+    int i = blockDim.y * blockIdx.y + threadIdx.y;
+    int tid = threadIdx.y * blockDim.x + threadIdx.x;
+
+    float sq = 0;
+
+    if (i < H_out && j < W_out) {
+        float r = M[0] * i + M[1] * j + b[0];
+        float c = M[2] * i + M[3] * j + b[1];
+
+        float result = cval;
+
+        if (r >= 0 && r <= H_in - 1 && c >= 0 && c <= W_in - 1) {
+            if (order == 0) {
+                // Nearest neighbor. Texel k covers texture coordinates [k, k+1).
+                result = tex2D<float>(tex, floorf(c + .5f) + .5f, floorf(r + .5f) + .5f);
+            } else {
+                // Bilinear. Texel centers are at half-integer texture coordinates.
+                result = tex2D<float>(tex, c + .5f, r + .5f);
+            }
+        }
+
+        result = fabsf(result);
+        if (!isnan(result)) { sq = result * result; }
+
+        out[i * W_out + j] = result;
+    }
+
+    // Reduce the sum of squares within the block.
+    sdata[tid] = sq;
+    __syncthreads();
+
+    for (int s = AFFINE_BLOCK_SIZE / 2; s > 0; s >>= 1) {
+        if (tid < s) {
+            sdata[tid] += sdata[tid + s];
+        }
+        __syncthreads();
+    }
+
+    // Accumulate across blocks.
+    if (tid == 0) {
+        atomicAdd(norm_sq, sdata[0]);
+    }
+}
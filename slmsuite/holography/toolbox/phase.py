@@ -20,8 +20,8 @@ from slmsuite.holography.toolbox import _process_grid, imprint, format_2vectors
 
 # Load CUDA code. This is used for cupy.RawKernels in this file and elsewhere.
 
-def _load_cuda():
-    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "cuda.cu"), 'r') as file:
+def _load_cuda(name="cuda.cu"):
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'r') as file:
         CUDA_KERNELS = file.read()
 
     return CUDA_KERNELS